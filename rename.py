@@ -1,36 +1,108 @@
-import glob
+import asyncio
+import fnmatch
+import json
 import os
+import re
 import warnings
-from datetime import timedelta
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import chain, islice
 
-import pandas as pd
+from openpyxl import load_workbook
 from tqdm import tqdm
 
 # 定义用于匹配Excel文件的模式
 EXCEL_PATTERN = "*-[0-9]*-[0-9a-zA-Z]*.xlsx"
+# 会议表格中入会和退会时间的格式
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# 其他可能出现的时间格式
+FALLBACK_TIME_FORMATS = ["%Y/%m/%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y/%m/%d %H:%M"]
+# 定义用于匹配会议文件的模式，捕获文件名中的时间戳
+FILE_NAME_PATTERNS = {
+    "video": re.compile(r"TM-(\d{14})-(.+)\.mp4"),
+    "transcription": re.compile(r"TencentMeeting_\((\d{14})\)_Transcription\.txt"),
+    "summary": re.compile(r"TencentMeeting_(\d{14})_Summary\.txt"),
+}
+# 会议信息缓存文件名，保存在会议文件所在目录
+CACHE_FILE_NAME = ".tmrec_cache.json"
+# 会议信息中需要序列化的时间字段
+MEETING_TIME_KEYS = ["earliest_join_time", "earliest_leave_time", "latest_leave_time"]
+# 文件名时间戳与会议时间之间允许的偏差，由小到大逐级放宽，最大为90秒
+TIME_TOLERANCES = [timedelta(seconds=5), timedelta(seconds=30), timedelta(seconds=90)]
 
 
-def extract_meeting_times(excel_file_path: str) -> tuple:
+def parse_time(value) -> datetime:
     """
-    从Excel文件中提取会议的首次入会时间和最后退会时间。
+    将单元格中的时间值转换为datetime对象。
     """
-    # 读取Excel文件
-    df = pd.read_excel(excel_file_path, header=7)
-    # 设置列名
-    df.columns = df.iloc[0]
-    df = df[1:]
-    # 转换时间列为datetime类型
-    df["首次入会时间"] = pd.to_datetime(df["首次入会时间"])
-    df["最后退会时间"] = pd.to_datetime(df["最后退会时间"])
+    # 以日期格式存储的单元格已由openpyxl转换为datetime
+    if isinstance(value, datetime):
+        return value
+    text = str(value).strip()
+    # 优先使用常见格式，失败时依次尝试其他格式
+    for time_format in [TIME_FORMAT, *FALLBACK_TIME_FORMATS]:
+        try:
+            return datetime.strptime(text, time_format)
+        except ValueError:
+            continue
+    return datetime.fromisoformat(text)
+
 
-    # 返回最早入会时间、最早和最晚离开时间
+def format_file_time(time: datetime) -> str:
+    """
+    将datetime对象格式化为文件名中的14位时间戳。
+    """
+    # 时间戳为定宽格式，直接拼接各字段，避免strftime的格式解析
     return (
-        df["首次入会时间"].min(),
-        df["最后退会时间"].min(),
-        df["最后退会时间"].max(),
+        f"{time.year:04d}{time.month:02d}{time.day:02d}"
+        f"{time.hour:02d}{time.minute:02d}{time.second:02d}"
     )
 
 
+def get_cell(row: tuple, col: int):
+    """
+    读取行中指定列的值，行末的空单元格可能被省略，视为空值。
+    """
+    return row[col] if len(row) > col else None
+
+
+def next_row(rows) -> tuple:
+    """
+    读取表格的下一行，行数不足时抛出异常。
+    """
+    row = next(rows, None)
+    if row is None:
+        raise ValueError("Meeting sheet is too short")
+    return row
+
+
+def extract_meeting_times(rows) -> tuple:
+    """
+    从会议表格的参会人数据行中提取会议的首次入会时间和最后退会时间。
+    """
+    # 第一行为表头，定位时间列
+    header = next_row(rows)
+    join_col, leave_col = header.index("首次入会时间"), header.index("最后退会时间")
+
+    # 单次遍历参会人数据，逐行累计最早入会时间、最早和最晚离开时间
+    earliest_join = earliest_leave = datetime.max
+    latest_leave = datetime.min
+    for row in rows:
+        join_time, leave_time = get_cell(row, join_col), get_cell(row, leave_col)
+        if join_time is not None:
+            earliest_join = min(earliest_join, parse_time(join_time))
+        if leave_time is not None:
+            leave_time = parse_time(leave_time)
+            earliest_leave = min(earliest_leave, leave_time)
+            latest_leave = max(latest_leave, leave_time)
+
+    if earliest_join is datetime.max or latest_leave is datetime.min:
+        raise ValueError("No attendee times found in meeting sheet")
+    return earliest_join, earliest_leave, latest_leave
+
+
 def read_meeting_info_from_excel(excel_file_path: str) -> dict:
     """
     从Excel文件中读取会议的基本信息。
@@ -39,15 +111,25 @@ def read_meeting_info_from_excel(excel_file_path: str) -> dict:
     if not os.path.exists(excel_file_path):
         raise FileNotFoundError(f"Excel file {excel_file_path} not found")
 
+    # 以只读模式打开Excel文件，会议信息和时间信息共用同一个工作表
     with warnings.catch_warnings(record=True):
         warnings.simplefilter("always")
+        workbook = load_workbook(excel_file_path, read_only=True, data_only=True)
+    try:
+        # 只读模式下按坐标取单元格会从头重新解析工作表，因此顺序流式读取所有行
+        # 工作表记录的尺寸可能缺失或错误（如"A1"），会导致行被截断，需重新计算
+        worksheet = workbook.active
+        worksheet.reset_dimensions()
+        rows = worksheet.iter_rows(values_only=True)
         # 读取会议主题和会议编号
-        df = pd.read_excel(excel_file_path, header=None, engine="openpyxl")
-        meeting_theme, meeting_number = df.iloc[0, 1], df.iloc[1, 1]
-        # 调用extract_meeting_times函数获取时间信息
+        meeting_theme = get_cell(next_row(rows), 1)
+        meeting_number = get_cell(next_row(rows), 1)
+        # 跳过第3至8行，从第9行表头开始获取时间信息
         earliest_join, earliest_leave, latest_leave = extract_meeting_times(
-            excel_file_path
+            islice(rows, 6, None)
         )
+    finally:
+        workbook.close()
 
     # 返回包含会议信息的字典
     return {
@@ -62,79 +144,176 @@ def read_meeting_info_from_excel(excel_file_path: str) -> dict:
     }
 
 
-def get_file_name_patterns(meeting_info: dict, delta_range=range(-90, 90)) -> dict:
+def read_meeting_info_task(excel_file_path: str) -> dict:
+    """
+    在进程池中读取会议信息，保证异常能够正常传回主进程。
+    """
+    try:
+        return read_meeting_info_from_excel(excel_file_path)
+    except StopIteration as e:
+        # StopIteration无法设置到asyncio的Future上，会导致等待永远不结束
+        raise RuntimeError(f"Unexpected end of iteration: {e!r}") from None
+
+
+def load_meeting_cache(directory_path: str) -> dict:
+    """
+    读取目录中缓存的会议信息。
+    """
+    try:
+        with open(os.path.join(directory_path, CACHE_FILE_NAME), encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def save_meeting_cache(directory_path: str, cache: dict) -> None:
+    """
+    将会议信息缓存写入目录，先写临时文件再替换，避免缓存文件写入不完整。
+    """
+    cache_path = os.path.join(directory_path, CACHE_FILE_NAME)
+    temp_path = cache_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, default=str)
+    os.replace(temp_path, cache_path)
+
+
+def meeting_info_to_cache(meeting_info: dict, stat: os.stat_result) -> dict:
+    """
+    将会议信息转换为可写入缓存的字典，并记录Excel文件的修改时间和大小。
+    """
+    entry = {
+        key: meeting_info[key]
+        for key in ["meeting_theme", "meeting_number", "base_name"]
+    }
+    for key in MEETING_TIME_KEYS:
+        entry[key] = meeting_info[key].isoformat()
+    entry["mtime_ns"], entry["size"] = stat.st_mtime_ns, stat.st_size
+    return entry
+
+
+def meeting_info_from_cache(entry: dict, excel_file_path: str) -> dict:
+    """
+    从缓存条目还原会议信息。
+    """
+    if not isinstance(entry["base_name"], str):
+        raise TypeError("Cached base_name must be a string")
+
+    meeting_info = {
+        "directory_path": os.path.dirname(excel_file_path),
+        "meeting_theme": entry["meeting_theme"],
+        "meeting_number": entry["meeting_number"],
+        "base_name": entry["base_name"],
+        "original_excel_name": excel_file_path,
+    }
+    for key in MEETING_TIME_KEYS:
+        meeting_info[key] = datetime.fromisoformat(entry[key])
+    return meeting_info
+
+
+def get_time_windows(meeting_info: dict) -> dict:
     """
-    根据会议信息和时间偏移，生成不同文件类型的文件名模式。
+    根据会议信息和允许的时间偏差，生成不同文件类型的文件名时间戳范围。
     """
     # 检查输入类型
     if not isinstance(meeting_info, dict):
         raise TypeError("meeting_info must be a dictionary")
 
-    patterns = {}
-    for key in ["video", "transcription", "summary"]:
-        patterns[key] = []
-        for delta in delta_range:
-            patterns[key].extend(generate_pattern(meeting_info, delta, key))
-
-    meeting_info["patterns"] = patterns
+    # 视频以最早入会时间命名，转写和纪要以最早或最晚离开时间命名
+    anchors = {
+        "video": [meeting_info["earliest_join_time"]],
+        "transcription": [
+            meeting_info["earliest_leave_time"],
+            meeting_info["latest_leave_time"],
+        ],
+        "summary": [
+            meeting_info["earliest_leave_time"],
+            meeting_info["latest_leave_time"],
+        ],
+    }
+    # 每个会议只格式化一次范围边界；定宽时间戳的字典序与时间先后一致，
+    # 匹配时可直接比较文件名中的时间戳字符串，无需逐个解析。
+    # 范围按允许偏差由小到大排列，查找时逐级放宽；每级包含各时间点附近的范围
+    meeting_info["time_windows"] = {
+        key: [
+            [
+                (
+                    format_file_time(time - tolerance),
+                    format_file_time(time + tolerance),
+                )
+                for time in times
+            ]
+            for tolerance in TIME_TOLERANCES
+        ]
+        for key, times in anchors.items()
+    }
     return meeting_info
 
 
-def generate_pattern(meeting_info: dict, delta: int, file_type: str) -> list:
-    """
-    生成特定文件类型的文件名模式。
-    """
-    time_format = "%Y%m%d%H%M%S"
-    if file_type == "video":
-        time_stamp = (
-            meeting_info["earliest_join_time"] + timedelta(seconds=delta)
-        ).strftime(time_format)
-        return [f"TM-{time_stamp}-{meeting_info['meeting_number']}-*.mp4"]
-    elif file_type == "transcription":
-        time_stamp_1 = (
-            meeting_info["earliest_leave_time"] + timedelta(seconds=delta)
-        ).strftime(time_format)
-        time_stamp_2 = (
-            meeting_info["latest_leave_time"] + timedelta(seconds=delta)
-        ).strftime(time_format)
-        return [
-            f"TencentMeeting_({time_stamp_1})_Transcription.txt",
-            f"TencentMeeting_({time_stamp_2})_Transcription.txt",
-        ]
-    elif file_type == "summary":
-        time_stamp_1 = (
-            meeting_info["earliest_leave_time"] + timedelta(seconds=delta)
-        ).strftime(time_format)
-        time_stamp_2 = (
-            meeting_info["latest_leave_time"] + timedelta(seconds=delta)
-        ).strftime(time_format)
-        return [
-            f"TencentMeeting_{time_stamp_1}_Summary.txt",
-            f"TencentMeeting_{time_stamp_2}_Summary.txt",
-        ]
+def index_meeting_files(entries: list) -> dict:
+    """
+    将目录文件按会议文件类型分类，并按文件名时间戳排序。
+    """
+    # 每个文件名只做一次正则匹配，之后各会议通过二分查找定位候选文件
+    file_index = {}
+    for file_type, pattern in FILE_NAME_PATTERNS.items():
+        matches = sorted(
+            filter(None, map(pattern.fullmatch, entries)),
+            key=lambda match: match.group(1),
+        )
+        file_index[file_type] = ([match.group(1) for match in matches], matches)
+    return file_index
 
 
-def find_matching_files(directory: str, patterns: list) -> list:
+def find_meeting_files(meeting_info: dict, file_index: dict) -> dict:
     """
-    在指定目录下查找匹配给定模式的文件。
+    在目录文件索引中查找会议对应的视频、转写和纪要文件。
     """
-    # 检查目录是否存在
-    if not os.path.isdir(directory):
-        raise FileNotFoundError(f"Directory {directory} not found")
-
-    # 查找匹配的文件并返回
-    return list(
-        {
-            file
-            for pattern in patterns
-            for file in glob.glob(os.path.join(directory, pattern))
-        }
-    )
+    meeting_info = get_time_windows(meeting_info)
+
+    for file_type, (time_stamps, matches) in file_index.items():
+        for windows in meeting_info["time_windows"][file_type]:
+            # 二分查找时间戳落在任一范围内的文件，范围重叠时去重
+            indices = sorted(
+                {
+                    index
+                    for start, end in windows
+                    for index in range(
+                        bisect_left(time_stamps, start), bisect_right(time_stamps, end)
+                    )
+                }
+            )
+            candidates = (matches[index] for index in indices)
+            # 视频文件名中还包含会议编号
+            if file_type == "video":
+                prefix = f"{meeting_info['meeting_number']}-"
+                candidates = (
+                    match for match in candidates if match.group(2).startswith(prefix)
+                )
+            # 只需判断是否唯一匹配，找到第二个匹配后即可停止
+            files = [match.string for match in islice(candidates, 2)]
+            # 一旦找到文件就不再放宽范围：更宽的范围只会带来更多候选
+            if files:
+                break
+        if len(files) == 1:
+            meeting_info[f"original_{file_type}_name"] = os.path.join(
+                meeting_info["directory_path"], files[0]
+            )
+
+    return meeting_info
 
 
-def rename_files(meeting_info: dict) -> None:
+def find_matching_files(entries: list, pattern: str) -> list:
     """
-    根据会议信息重命名文件。
+    在目录文件列表中查找匹配给定模式的文件名。
+    """
+    # 在内存中匹配文件名，避免重复扫描目录
+    return fnmatch.filter(entries, pattern)
+
+
+def get_rename_plan(meeting_info: dict) -> list:
+    """
+    根据会议信息生成文件重命名计划。
     """
     # 检查输入类型
     if not isinstance(meeting_info, dict):
@@ -156,42 +335,173 @@ def rename_files(meeting_info: dict) -> None:
     ]
     suffixes = [".xlsx", ".mp4", "_Transcription.txt", "_Summary.txt"]
 
-    # 重命名文件
-    for file_type, suffix in zip(file_types, suffixes):
-        original_file = meeting_info.get(file_type)
-        if original_file and os.path.exists(original_file):
-            new_name = os.path.join(directory, base_name + suffix)
-            os.rename(original_file, new_name)
+    # 生成(原文件, 新文件)列表
+    return [
+        (meeting_info[file_type], os.path.join(directory, base_name + suffix))
+        for file_type, suffix in zip(file_types, suffixes)
+        if meeting_info.get(file_type)
+    ]
+
+
+def rename_files(rename_plan: list) -> list:
+    """
+    按照重命名计划批量重命名文件，返回实际完成的重命名列表。
+    """
+    # 检查输入类型
+    if not isinstance(rename_plan, list):
+        raise TypeError("rename_plan must be a list")
+
+    # 统计源文件名，同一文件被多个会议认领说明匹配有歧义
+    source_counts = Counter(
+        os.path.normcase(original_file) for original_file, _ in rename_plan
+    )
+    # 统计目标文件名，同一目标出现多次说明多个会议的基础文件名相同
+    target_counts = Counter(os.path.normcase(new_name) for _, new_name in rename_plan)
+
+    # 重命名文件，文件已在扫描目录时找到，无需再次检查是否存在
+    renamed = []
+    for original_file, new_name in rename_plan:
+        if os.path.normcase(original_file) == os.path.normcase(new_name):
+            continue
+        if source_counts[os.path.normcase(original_file)] > 1:
+            print(f"Skipping {original_file}: claimed by multiple meetings")
+            continue
+        # 目标冲突或已存在时跳过，避免覆盖其他会议的文件
+        if target_counts[os.path.normcase(new_name)] > 1:
+            print(
+                f"Skipping {original_file}: multiple files would be renamed to {new_name}"
+            )
+            continue
+        if os.path.exists(new_name):
+            print(f"Skipping {original_file}: {new_name} already exists")
+            continue
+        try:
+            os.replace(original_file, new_name)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            print(f"Error renaming file {original_file}: {e}")
+            continue
+        renamed.append((original_file, new_name))
+    return renamed
+
+
+def list_directory(directory_path: str) -> list:
+    """
+    列出目录中的所有文件名。
+    """
+    # 文件类型由扫描结果直接给出，无需额外的stat调用
+    with os.scandir(directory_path) as it:
+        return [entry.name for entry in it if entry.is_file()]
 
 
 def process_meetings(directory_path: str):
     """
     处理指定目录下的会议文件。
     """
+    asyncio.run(process_meetings_async(directory_path))
+
+
+async def process_meetings_async(directory_path: str):
+    """
+    异步处理指定目录下的会议文件。
+    """
     # 检查目录是否存在
     if not os.path.isdir(directory_path):
         raise FileNotFoundError(f"Directory {directory_path} not found")
 
+    # 只扫描一次目录，后续所有匹配都在该文件列表上进行
+    entries = await asyncio.to_thread(list_directory, directory_path)
+    file_index = index_meeting_files(entries)
+
     # 查找匹配的Excel文件
-    excel_files = find_matching_files(directory_path, [EXCEL_PATTERN])
+    excel_files = [
+        os.path.join(directory_path, name)
+        for name in find_matching_files(entries, EXCEL_PATTERN)
+    ]
     if not excel_files:
         print("No Excel files found.")
         return
 
-    # 遍历并处理每个Excel文件
-    for excel_file in tqdm(excel_files, desc="Processing files"):
+    # 每个会议的重命名计划，全部查找完成后再展平
+    meeting_plans = []
+
+    def plan_meeting(meeting_info: dict) -> list:
+        # 查找会议对应的文件并生成重命名计划
+        try:
+            find_meeting_files(meeting_info, file_index)
+            return get_rename_plan(meeting_info)
+        except Exception as e:
+            print(f"Error processing file {meeting_info['original_excel_name']}: {e}")
+            return []
+
+    # 读取上次运行的缓存，跳过修改时间和大小均未变化的Excel文件
+    cache, updated_cache, stats = load_meeting_cache(directory_path), {}, {}
+    for excel_file in excel_files:
+        name = os.path.basename(excel_file)
         try:
-            meeting_info = read_meeting_info_from_excel(excel_file)
-            meeting_info = get_file_name_patterns(meeting_info)
+            stat = os.stat(excel_file)
+        except OSError as e:
+            print(f"Error processing file {excel_file}: {e}")
+            continue
+
+        # 缓存条目缺失、过期或损坏时，视为未命中并重新解析
+        meeting_info, entry = None, cache.get(name)
+        if isinstance(entry, dict) and (entry.get("mtime_ns"), entry.get("size")) == (
+            stat.st_mtime_ns,
+            stat.st_size,
+        ):
+            try:
+                meeting_info = meeting_info_from_cache(entry, excel_file)
+            except (KeyError, TypeError, ValueError, AttributeError):
+                meeting_info = None
+        if meeting_info is None:
+            stats[excel_file] = stat
+            continue
 
-            # 对于每种文件类型，查找并重命名文件
-            for file_type in ["video", "transcription", "summary"]:
-                files = find_matching_files(
-                    directory_path, meeting_info["patterns"][file_type]
+        updated_cache[name] = entry
+        meeting_plans.append(plan_meeting(meeting_info))
+
+    loop = asyncio.get_running_loop()
+    max_workers = os.cpu_count() or 1
+    # 限制同时提交到进程池的任务数，避免一次性排队所有文件
+    semaphore = asyncio.Semaphore(2 * max_workers)
+
+    async def read_meeting_info(excel_file: str):
+        async with semaphore:
+            try:
+                return await loop.run_in_executor(
+                    executor, read_meeting_info_task, excel_file
                 )
-                if len(files) == 1:
-                    meeting_info[f"original_{file_type}_name"] = files[0]
+            except Exception as e:
+                print(f"Error processing file {excel_file}: {e}")
 
-            rename_files(meeting_info)
-        except Exception as e:
-            print(f"Error processing file {excel_file}: {e}")
+    # Excel解析为CPU密集型任务，交给进程池并行执行；
+    # 主进程在等待其余文件解析的同时，查找已解析会议对应的文件并汇总重命名计划
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        tasks = [read_meeting_info(excel_file) for excel_file in stats]
+        for task in tqdm(
+            asyncio.as_completed(tasks), total=len(tasks), desc="Processing files"
+        ):
+            meeting_info = await task
+            if meeting_info is None:
+                continue
+            excel_file = meeting_info["original_excel_name"]
+            updated_cache[os.path.basename(excel_file)] = meeting_info_to_cache(
+                meeting_info, stats[excel_file]
+            )
+            meeting_plans.append(plan_meeting(meeting_info))
+
+    # 所有文件查找完成后再统一重命名，保证查找时目录不被修改
+    rename_plan = list(chain.from_iterable(meeting_plans))
+    renamed = rename_files(rename_plan)
+
+    # 重命名后Excel文件的修改时间和大小不变，缓存条目随文件名一起更新
+    for original_file, new_name in renamed:
+        entry = updated_cache.pop(os.path.basename(original_file), None)
+        if entry is not None:
+            updated_cache[os.path.basename(new_name)] = entry
+    try:
+        save_meeting_cache(directory_path, updated_cache)
+    except OSError as e:
+        print(f"Error saving meeting cache: {e}")
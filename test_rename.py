@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime
+
+from openpyxl import Workbook
+
+from rename import process_meetings_async
+
+
+def save_meeting_workbook(path, theme, number, attendee_times):
+    """
+    按会议导出格式生成Excel文件：第1、2行为主题和会议号，第9行为表头。
+    """
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet["A1"], worksheet["B1"] = "会议主题", theme
+    worksheet["A2"], worksheet["B2"] = "会议号", number
+    for col, title in enumerate(["用户昵称", "首次入会时间", "最后退会时间"], 1):
+        worksheet.cell(row=9, column=col, value=title)
+    for row, (join_time, leave_time) in enumerate(attendee_times, 10):
+        worksheet.cell(row=row, column=1, value=f"user{row}")
+        worksheet.cell(row=row, column=2, value=join_time.strftime("%Y-%m-%d %H:%M:%S"))
+        worksheet.cell(
+            row=row, column=3, value=leave_time.strftime("%Y-%m-%d %H:%M:%S")
+        )
+    workbook.save(path)
+
+
+def test_short_workbook_is_reported_and_skipped(tmp_path, capsys):
+    """
+    行数不足的Excel文件应被报告并跳过，而不是使处理过程卡住。
+    """
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet["A1"], worksheet["B1"] = "会议主题", "周会"
+    worksheet["A2"], worksheet["B2"] = "会议号", "123456789"
+    excel_file = tmp_path / "周会-123456789-abc.xlsx"
+    workbook.save(excel_file)
+
+    asyncio.run(asyncio.wait_for(process_meetings_async(str(tmp_path)), 60))
+
+    assert "Meeting sheet is too short" in capsys.readouterr().out
+    assert excel_file.exists()
+
+
+def test_transcript_between_leave_times_belongs_to_other_meeting(tmp_path):
+    """
+    同一天另一会议的转写文件落在本会议两个离开时间之间时，不应被误认。
+    """
+    save_meeting_workbook(
+        tmp_path / "周会-111-a.xlsx",
+        "周会",
+        "111",
+        [
+            (datetime(2023, 12, 20, 9, 0, 0), datetime(2023, 12, 20, 10, 0, 30)),
+            (datetime(2023, 12, 20, 9, 0, 5), datetime(2023, 12, 20, 11, 0, 0)),
+        ],
+    )
+    save_meeting_workbook(
+        tmp_path / "评审-222-b.xlsx",
+        "评审",
+        "222",
+        [(datetime(2023, 12, 20, 9, 30, 0), datetime(2023, 12, 20, 10, 30, 0))],
+    )
+    (tmp_path / "TencentMeeting_(20231220110020)_Transcription.txt").write_text("a")
+    (tmp_path / "TencentMeeting_(20231220103000)_Transcription.txt").write_text("b")
+
+    asyncio.run(asyncio.wait_for(process_meetings_async(str(tmp_path)), 60))
+
+    assert (tmp_path / "【2023-12-20】周会_Transcription.txt").read_text() == "a"
+    assert (tmp_path / "【2023-12-20】评审_Transcription.txt").read_text() == "b"